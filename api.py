@@ -0,0 +1,253 @@
+"""
+API HTTP/JSON de solo lectura para marcadores y listados de la liga.
+
+Rutas: /ciudades, /estadisticas, /equipos, /jugadores, /juegos,
+/juegos/<IdJuego>/estadisticas y /posiciones.
+
+Corre como proceso aparte de Streamlit y reutiliza los helpers. Cada ruta
+se consulta a lo sumo una vez cada API_MAX_AGE segundos, sin importar
+cuantos clientes hagan polling; las respuestas llevan ETag y Cache-Control
+para que los clientes puedan revalidar con If-None-Match (304 sin cuerpo).
+
+Uso:
+    python api.py serve --port 8502
+    python api.py bench --url http://localhost:8502/juegos --requests 5000 --concurrency 32
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from helpers import (
+    BaseDeDatosNoDisponible,
+    list_ciudades, list_estadisticas, list_equipos, list_jugadores,
+    list_juegos_detalle, get_estadisticas_juego,
+)
+from standings import tabla_posiciones
+
+# Segundos que una respuesta se sirve sin volver a la base (y max-age del cliente)
+MAX_AGE = int(os.getenv("API_MAX_AGE", "5"))
+
+# Ruta -> helper (ya cacheados con st.cache_data)
+LISTADOS = {
+    "/ciudades": list_ciudades,
+    "/estadisticas": list_estadisticas,
+    "/equipos": list_equipos,
+    "/jugadores": list_jugadores,
+    "/juegos": list_juegos_detalle,
+}
+
+_respuestas = {}  # ruta -> (vence, etag, cuerpo); solo rutas existentes
+_locks = {}
+_locks_guard = threading.Lock()
+_limpiezas = {}  # helper -> momento en que se vacio su cache por ultima vez
+
+
+def _df_json(df) -> str:
+    return df.to_json(orient="records", date_format="iso", force_ascii=False)
+
+
+def _fresco(fn):
+    """Vacia la cache de un helper a lo sumo una vez cada MAX_AGE segundos."""
+    with _locks_guard:
+        ahora = time.monotonic()
+        if ahora - _limpiezas.get(fn.__name__, float("-inf")) >= MAX_AGE:
+            fn.clear()  # la frescura la controla MAX_AGE, no el TTL de la app
+            _limpiezas[fn.__name__] = ahora
+    return fn
+
+
+def _id_juego(ruta: str):
+    """IdJuego de /juegos/<IdJuego>/estadisticas, o None si la ruta es otra."""
+    partes = ruta.strip("/").split("/")
+    if len(partes) == 3 and partes[0] == "juegos" and partes[2] == "estadisticas":
+        return partes[1]
+    return None
+
+
+def _existe(ruta: str) -> bool:
+    if ruta in LISTADOS or ruta == "/posiciones":
+        return True
+    id_juego = _id_juego(ruta)
+    if id_juego is None:
+        return False
+    ids = _fresco(list_juegos_detalle)().IdJuego.astype(str).str.strip()
+    return id_juego in set(ids)
+
+
+def _cuerpo(ruta: str) -> str:
+    """Genera el JSON de una ruta existente."""
+    if ruta in LISTADOS:
+        return _df_json(_fresco(LISTADOS[ruta])())
+
+    if ruta == "/posiciones":
+        juegos = _fresco(list_juegos_detalle)()
+        return _df_json(tabla_posiciones(juegos, _fresco(list_equipos)()))
+
+    df_local, df_visit = _fresco(get_estadisticas_juego)(_id_juego(ruta))
+    return f'{{"local":{_df_json(df_local)},"visitante":{_df_json(df_visit)}}}'
+
+
+def obtener(ruta: str):
+    """
+    Devuelve (etag, cuerpo) de la ruta desde la cache compartida, o
+    (None, None) si no existe. Solo un hilo por ruta regenera la respuesta
+    vencida; el resto espera y la reutiliza.
+    """
+    cacheada = _respuestas.get(ruta)
+    if cacheada and cacheada[0] > time.monotonic():
+        return cacheada[1], cacheada[2]
+
+    # validar antes de crear entradas: las rutas inventadas no llenan las caches
+    if not _existe(ruta):
+        with _locks_guard:
+            _respuestas.pop(ruta, None)  # p.ej. un juego eliminado
+            _locks.pop(ruta, None)
+        return None, None
+
+    with _locks_guard:
+        lock = _locks.setdefault(ruta, threading.Lock())
+    with lock:
+        cacheada = _respuestas.get(ruta)
+        if cacheada and cacheada[0] > time.monotonic():
+            return cacheada[1], cacheada[2]
+        cuerpo = _cuerpo(ruta).encode("utf-8")
+        etag = '"' + hashlib.sha1(cuerpo).hexdigest()[:16] + '"'
+        _respuestas[ruta] = (time.monotonic() + MAX_AGE, etag, cuerpo)
+        return etag, cuerpo
+
+
+def _coincide(if_none_match: str, etag: str) -> bool:
+    """If-None-Match: lista separada por comas, '*' y comparacion debil (W/)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    propio = etag.removeprefix("W/")
+    return any(e.strip().removeprefix("W/") == propio for e in if_none_match.split(","))
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    verbose = False
+
+    def do_GET(self):
+        ruta = self.path.split("?", 1)[0].rstrip("/") or "/"
+        try:
+            etag, cuerpo = obtener(ruta)
+        except BaseDeDatosNoDisponible as e:
+            return self._error(503, str(e))
+        except Exception as e:
+            return self._error(500, str(e))
+        if cuerpo is None:
+            return self._error(404, f"Ruta no encontrada: {ruta}")
+
+        if _coincide(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self._cabeceras_cache(etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self._cabeceras_cache(etag)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _cabeceras_cache(self, etag: str):
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", f"public, max-age={MAX_AGE}")
+
+    def _error(self, codigo: int, mensaje: str):
+        cuerpo = json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+
+def serve(host: str, port: int, verbose: bool = False):
+    Handler.verbose = verbose
+    servidor = ThreadingHTTPServer((host, port), Handler)
+    servidor.daemon_threads = True
+    print(f"API escuchando en http://{host}:{port} (max-age {MAX_AGE}s)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+def bench(url: str, total: int, concurrencia: int, condicional: bool):
+    """Mide requests/seg y latencias contra una ruta de la API."""
+    etag = None
+    if condicional:
+        with urlopen(url) as resp:
+            etag = resp.headers.get("ETag")
+
+    def una(_):
+        req = Request(url, headers={"If-None-Match": etag} if etag else {})
+        inicio = time.perf_counter()
+        try:
+            with urlopen(req) as resp:
+                resp.read()
+                codigo = resp.status
+        except HTTPError as e:
+            codigo = e.code
+        return time.perf_counter() - inicio, codigo
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(una, range(total)))
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(r[0] * 1000 for r in resultados)
+    codigos = {}
+    for _, codigo in resultados:
+        codigos[codigo] = codigos.get(codigo, 0) + 1
+    cuantiles = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else latencias * 99
+    print(f"{total} requests, concurrencia {concurrencia}, {duracion:.2f}s")
+    print(f"  {total / duracion:,.0f} req/s")
+    print(f"  p50 {cuantiles[49]:.2f} ms  p95 {cuantiles[94]:.2f} ms  p99 {cuantiles[98]:.2f} ms")
+    print(f"  codigos: {codigos}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_serve = sub.add_parser("serve", help="levanta la API")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8502)
+    p_serve.add_argument("--verbose", action="store_true")
+
+    p_bench = sub.add_parser("bench", help="mide requests/seg contra una ruta")
+    p_bench.add_argument("--url", default="http://127.0.0.1:8502/juegos")
+    p_bench.add_argument("--requests", type=int, default=2000)
+    p_bench.add_argument("--concurrency", type=int, default=16)
+    p_bench.add_argument("--etag", action="store_true", help="enviar If-None-Match (respuestas 304)")
+
+    args = parser.parse_args()
+    if args.comando == "serve":
+        serve(args.host, args.port, args.verbose)
+    else:
+        bench(args.url, args.requests, args.concurrency, args.etag)
+
+
+if __name__ == "__main__":
+    main()
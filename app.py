@@ -1,24 +1,102 @@
 import streamlit as st
 from datetime import date, datetime
+import profiling
+import warmup
+from standings import tabla_posiciones
 from helpers import (
     # genéricos
-    get_conn, fetch_df, exec_sql,
+    get_pool, get_read_pool, fetch_df, exec_sql, exec_scalar,
+    iniciar_rerun, datos_obsoletos,
     #App helpers
     insert_ciudad, list_ciudades, update_ciudad, delete_ciudad,
     insert_estadistica, list_estadisticas, update_estadistica, delete_estadistica,
     insert_equipo, list_equipos, update_equipo, delete_equipo,
     insert_jugador, list_jugadores, update_jugador, delete_jugador,
-    list_juegos, insert_juego, update_juego, delete_juego,
+    list_juegos, list_juegos_detalle, insert_juego, update_juego, delete_juego,
     get_estadisticas_juego,
     insert_estadistica_juego,
+    reporte_memoria,
+    TABLAS_MASIVAS, largo_maximo, conflictos_masivos, aplicar_masivo,
+    iniciar_snapshots,
 )
 
 # Conf Streamlit
 st.set_page_config(page_title="Gestión de Liga", layout="wide")
 
+# Snapshots de referencia: se cargan y validan una vez por proceso
+iniciar_snapshots()
+# Calentamiento de conexiones y caches en segundo plano (una vez por proceso)
+estado_warmup = warmup.iniciar()
+
+
+def edicion_masiva(tabla: str, df, id_col: str, editables: list, config: dict = None):
+    """
+    Grid editable para eliminar (columna Eliminar) o modificar varias filas
+    de una tabla y aplicarlas juntas en una sola transaccion.
+    """
+    if df.empty:
+        st.info("No hay registros.")
+        return
+
+    # categorias -> object para poder elegir valores nuevos; enteros sin reducir
+    tipos = {}
+    for c in df.columns:
+        if df[c].dtype == "category":
+            tipos[c] = object
+        elif df[c].dtype.kind in "iu":
+            tipos[c] = "int64"
+    base = df.astype(tipos)
+    base.insert(0, "Eliminar", False)
+
+    # textos con el largo de su columna NVARCHAR/CHAR para que no se trunquen
+    columnas = {}
+    for c, tipo in TABLAS_MASIVAS[tabla]["columnas"].items():
+        largo = largo_maximo(tipo)
+        if c in editables and largo is not None and base[c].dtype.kind == "O":
+            columnas[c] = st.column_config.TextColumn(max_chars=largo)
+    columnas.update(config or {})
+
+    version = st.session_state.setdefault(f"masivo_{tabla}_v", 0)
+    editado = st.data_editor(
+        base,
+        key=f"masivo_{tabla}_{version}",
+        hide_index=True,
+        use_container_width=True,
+        disabled=[c for c in base.columns if c not in editables and c != "Eliminar"],
+        column_config=columnas,
+    )
+
+    eliminar = editado.Eliminar.astype(bool)
+    cambiado = editado[editables].astype(str).ne(base[editables].astype(str)).any(axis=1)
+    ids_eliminar = editado.loc[eliminar, id_col].tolist()
+    df_cambios = editado.loc[cambiado & ~eliminar, [id_col] + editables]
+    st.caption(f"{len(ids_eliminar)} fila(s) para eliminar, {len(df_cambios)} modificada(s).")
+    if not ids_eliminar and df_cambios.empty:
+        return
+
+    try:
+        conflictos = conflictos_masivos(tabla, ids_eliminar, df_cambios)
+    except Exception as e:
+        st.error(f"Error al revisar conflictos: {e}")
+        return
+    if not conflictos.empty:
+        st.error("Hay conflictos de llaves foráneas; corrígelos antes de aplicar:")
+        st.dataframe(conflictos, use_container_width=True, hide_index=True)
+        return
+
+    if st.button("Aplicar cambios", key=f"btn_masivo_{tabla}"):
+        try:
+            aplicar_masivo(tabla, ids_eliminar, df_cambios)
+            st.success(
+                f"{tabla}: {len(ids_eliminar)} eliminada(s) y {len(df_cambios)} modificada(s)."
+            )
+            st.session_state[f"masivo_{tabla}_v"] += 1
+        except Exception as e:
+            st.error(f"Error en la operación masiva: {e}")
 
 
 def main():
+    iniciar_rerun()
     st.title("Sistema de Gestión de Liga")
 
     menu = [
@@ -28,10 +106,20 @@ def main():
         "🎮 CRUD Jugador",
         "🎲 CRUD Juego",
         "📈 Estadísticas Juego",
-        "➕ Agregar Estadística Juego"     
+        "➕ Agregar Estadística Juego",
+        "🏆 Tabla de Posiciones",
     ]
     choice = st.sidebar.radio("Menú principal", menu)
 
+    if not estado_warmup.listo.is_set():
+        st.sidebar.caption("⏳ Calentando conexiones y caché…")
+
+    # Uso de memoria de los datasets cacheados (opcional)
+    if st.sidebar.checkbox("💾 Mostrar memoria en caché"):
+        df_mem = reporte_memoria()
+        st.sidebar.dataframe(df_mem, hide_index=True)
+        st.sidebar.caption(f"Total: {df_mem.Bytes.sum() / 1024:.1f} KiB")
+
     # CIUDAD =============================
     if choice == "🏙️ CRUD Ciudad":
         st.subheader("CRUD Ciudad")
@@ -116,6 +204,10 @@ def main():
                     except Exception as e:
                         st.error(f"Error al eliminar la ciudad: {e}")
 
+        # Edicion masiva
+        with st.expander("🧹 Edición masiva de ciudades"):
+            edicion_masiva("Ciudad", list_ciudades(), "IdCiudad", ["NomCiudad"])
+
         # Lista de ciudades siempre visible
         st.markdown("### Lista de ciudades")
         st.dataframe(list_ciudades(), use_container_width=True)
@@ -211,6 +303,13 @@ def main():
                     except Exception as Error:
                         st.error(f"Error al eliminar la estadística: {Error}")
 
+        # Edicion masiva
+        with st.expander("🧹 Edición masiva de estadísticas"):
+            edicion_masiva(
+                "Estadistica", list_estadisticas(), "IdEstadistica",
+                ["DescripcionEstadistica", "Valor"],
+            )
+
         # Lista de estadisticas siempre visible
         st.markdown("### Lista de estadísticas")
         st.dataframe(list_estadisticas(), use_container_width=True)
@@ -309,6 +408,17 @@ def main():
                     except Exception as e:
                         st.error(f"Error al eliminar equipo: {e}")
 
+        # Edicion masiva
+        with st.expander("🧹 Edición masiva de equipos"):
+            edicion_masiva(
+                "Equipo", list_equipos(), "IdEquipo", ["NomEquipo", "IdCiudad"],
+                config={
+                    "IdCiudad": st.column_config.SelectboxColumn(
+                        "IdCiudad", options=list_ciudades().IdCiudad.tolist()
+                    ),
+                },
+            )
+
         # Lista de equipos siempre visible
         st.markdown("### Lista de equipos")
         st.dataframe(list_equipos(), use_container_width=True)
@@ -432,6 +542,23 @@ def main():
                     except Exception as e:
                         st.error(f"Error al eliminar jugador: {e}")
 
+        # Edicion masiva (traspasos, cambios de numero, bajas)
+        with st.expander("🧹 Edición masiva de jugadores"):
+            edicion_masiva(
+                "Jugador", list_jugadores(), "IdJugador",
+                ["NomJugador", "IdCiudad", "FechaNacimiento", "NumJugador", "IdEquipo"],
+                config={
+                    "IdCiudad": st.column_config.SelectboxColumn(
+                        "IdCiudad", options=list_ciudades().IdCiudad.tolist()
+                    ),
+                    "IdEquipo": st.column_config.SelectboxColumn(
+                        "IdEquipo", options=list_equipos().IdEquipo.tolist()
+                    ),
+                    "FechaNacimiento": st.column_config.DateColumn("FechaNacimiento"),
+                    "NumJugador": st.column_config.NumberColumn("NumJugador", min_value=0, step=1),
+                },
+            )
+
         # Lista de jugadores siempre visible
         st.markdown("### Lista de jugadores")
         st.dataframe(list_jugadores(), use_container_width=True)
@@ -493,7 +620,7 @@ def main():
                     # Modificar Juego
         elif st.session_state.show_juego_update:
             st.markdown("### Modificar juego existente")
-            df_jg = list_juegos()
+            df_jg = list_juegos_detalle()
             if df_jg.empty:
                 st.warning("No hay juegos registrados.")
             else:
@@ -507,11 +634,8 @@ def main():
                 curr = df_jg[df_jg.IdJuego == id_sel].iloc[0]
 
                 # 2) Mostrar equipos (no modificables)
-                df_eq = list_equipos()
-                nom_a = df_eq.loc[df_eq.IdEquipo == curr.IdEquipoA, "NomEquipo"].iloc[0]
-                nom_b = df_eq.loc[df_eq.IdEquipo == curr.IdEquipoB, "NomEquipo"].iloc[0]
-                st.text(f"Equipo A: {curr.IdEquipoA} - {nom_a}")
-                st.text(f"Equipo B: {curr.IdEquipoB} - {nom_b}")
+                st.text(f"Equipo A: {curr.IdEquipoA} - {curr.EquipoA} ({curr.CiudadA})")
+                st.text(f"Equipo B: {curr.IdEquipoB} - {curr.EquipoB} ({curr.CiudadB})")
 
                 # 3) Fecha y hora
                 new_fecha = st.date_input(
@@ -556,6 +680,13 @@ def main():
                         st.error(f"Error al eliminar juego: {e}")
 
 
+        # Edicion masiva
+        with st.expander("🧹 Edición masiva de juegos"):
+            edicion_masiva(
+                "Juego", list_juegos(), "IdJuego", ["FechaYHoraJuego"],
+                config={"FechaYHoraJuego": st.column_config.DatetimeColumn("FechaYHoraJuego")},
+            )
+
         # Lista de juegos siempre visible
         st.markdown("### Lista de juegos")
         st.dataframe(list_juegos(), use_container_width=True)
@@ -566,7 +697,7 @@ def main():
         st.subheader("📊 Estadísticas del Juego")
 
         # 1) Seleccion de partido
-        df_jg = list_juegos()
+        df_jg = list_juegos_detalle()
         if df_jg.empty:
             st.warning("No hay juegos registrados.")
         else:
@@ -586,9 +717,8 @@ def main():
                 st.markdown(f"**Juego:** {id_sel}  **Fecha:** {curr.FechaYHoraJuego}")
 
                 # Nombre de equipos
-                df_eq = list_equipos()
-                nom_local = df_eq.loc[df_eq.IdEquipo == curr.IdEquipoA, "NomEquipo"].iloc[0]
-                nom_visit = df_eq.loc[df_eq.IdEquipo == curr.IdEquipoB, "NomEquipo"].iloc[0]
+                nom_local = curr.EquipoA
+                nom_visit = curr.EquipoB
 
                 #4) Mostrar tablas
                 st.markdown(f"#### Equipo Local: {nom_local}")
@@ -597,9 +727,9 @@ def main():
                 st.markdown(f"#### Equipo Visitante: {nom_visit}")
                 st.dataframe(df_visit, use_container_width=True)
 
-                #5) Marcador final
-                pts_local = int(df_local.loc[df_local["Jugador"] == "Total", "Puntos"])
-                pts_visit = int(df_visit.loc[df_visit["Jugador"] == "Total", "Puntos"])
+                #5) Marcador final (ya agregado en list_juegos_detalle)
+                pts_local = int(curr.PuntosA)
+                pts_visit = int(curr.PuntosB)
                 ganador = (
                     nom_local if pts_local > pts_visit
                     else nom_visit if pts_visit > pts_local
@@ -619,7 +749,7 @@ def main():
         st.subheader("➕ Agregar Estadística a un Juego")
 
         # Seleccion de juego
-        df_jg = list_juegos()
+        df_jg = list_juegos_detalle()
         if df_jg.empty:
             st.warning("No hay juegos registrados.")
         else:
@@ -632,13 +762,11 @@ def main():
 
             # Seleccion de equipo (A o B)
             curr = df_jg[df_jg.IdJuego == id_juego].iloc[0]
-            df_eq = list_equipos()
-            # extrae nombres para los dos equipos del juego
-            equipos = []
-            for col in ("IdEquipoA", "IdEquipoB"):
-                eq_id = curr[col]
-                nom = df_eq.loc[df_eq.IdEquipo == eq_id, "NomEquipo"].iloc[0]
-                equipos.append(f"{eq_id} - {nom}")
+            # nombres de los dos equipos del juego (ya vienen en el listado)
+            equipos = [
+                f"{curr.IdEquipoA} - {curr.EquipoA}",
+                f"{curr.IdEquipoB} - {curr.EquipoB}",
+            ]
             sel_eq = st.selectbox("Selecciona el equipo", equipos)
             id_equipo = sel_eq.split(" - ")[0]
 
@@ -675,10 +803,41 @@ def main():
                     except Exception as e:
                         st.error(f"Error al agregar estadística: {e}")
 
+    # TABLA DE POSICIONES ================
+    elif choice == "🏆 Tabla de Posiciones":
+        st.subheader("🏆 Tabla de Posiciones")
+        try:
+            tabla = tabla_posiciones(list_juegos_detalle(), list_equipos())
+            if tabla.empty:
+                st.warning("No hay equipos registrados.")
+            else:
+                st.dataframe(
+                    tabla,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "PctVictorias": st.column_config.NumberColumn("% Victorias", format="%.3f"),
+                        "H2H": st.column_config.NumberColumn("H2H", format="%.3f"),
+                    },
+                )
+                st.caption(
+                    "Solo cuentan juegos con estadísticas registradas. Desempate: % de victorias, "
+                    "enfrentamientos directos entre empatados (H2H), diferencia de puntos, puntos a favor."
+                )
+        except Exception as e:
+            st.error(f"Error al calcular la tabla de posiciones: {e}")
+
+    # Aviso si la base no respondio y se mostraron datos previos
+    if datos_obsoletos():
+        st.warning("La base de datos no responde: se muestran los últimos datos disponibles.")
 
     
 
 
 
 if __name__ == "__main__":
-    main()
+    # ?profile=1 o BASKET_PROFILE=1 perfila este rerun
+    if profiling.activo():
+        profiling.perfilar(main)
+    else:
+        main()
@@ -1,27 +1,529 @@
 import os
+import json
+import time
+import queue
+import threading
+import functools
+from collections import OrderedDict
+from contextlib import contextmanager
 import pyodbc
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
+from streamlit.logger import get_logger
+import snapshots
+from tenacity import (
+    Retrying, retry_if_exception, stop_after_attempt, stop_after_delay,
+    wait_random_exponential,
+)
+
+log = get_logger(__name__)
 
 #  Configuracion base de datos 
 load_dotenv()
 CONN_STR = os.getenv("DB_CONN")
+# Destino opcional de solo lectura (replica o secundario legible). Si no se
+# define, las lecturas van al primario. Para probar en local basta con dos
+# bases LocalDB, p.ej. AttachDbFilename=primario.mdf / replica.mdf.
+CONN_STR_READ = os.getenv("DB_CONN_READ")
+# Segundos que las lecturas siguen en el primario despues de una escritura.
+# La ventana es de todo el proceso: la cache se comparte entre sesiones y lo
+# que cualquiera recargue en ese lapso es lo que luego ven todas.
+READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+
+_ultima_escritura = float("-inf")  # momento de la ultima escritura del proceso
+
+# Timeouts (segundos). Cada helper se puede ajustar con DB_TIMEOUT_<HELPER>,
+# p.ej. DB_TIMEOUT_GET_ESTADISTICAS_JUEGO=30
+LOGIN_TIMEOUT = int(os.getenv("DB_LOGIN_TIMEOUT", "10"))
+QUERY_TIMEOUT = int(os.getenv("DB_QUERY_TIMEOUT", "15"))
+# Tiempo total de base de datos permitido en un rerun de la app
+RERUN_DEADLINE = float(os.getenv("DB_RERUN_DEADLINE", "30"))
+# Reintentos de lecturas ante errores transitorios
+RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "3"))
+# Circuit breaker: fallas seguidas para abrir y segundos abierto
+BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("DB_BREAKER_COOLDOWN", "30"))
+# Pool: conexiones por destino y segundos maximos esperando una libre
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+POOL_WAIT = float(os.getenv("DB_POOL_WAIT", "10"))
+# Ultimos resultados buenos que se guardan para servir si la base se cae
+RESPALDOS_MAX = int(os.getenv("DB_RESPALDOS_MAX", "200"))
+
+# SQLSTATE de enlace/conexion caida, timeout y deadlock
+_SQLSTATE_CONEXION = {"08S01", "08001", "08003", "08004"}
+_SQLSTATE_TIMEOUT = {"HYT00", "HYT01"}
+_SQLSTATE_REINTENTABLES = _SQLSTATE_CONEXION | {"40001"}
+
+class DeadlineExcedido(TimeoutError):
+    """Se agoto el tiempo de base de datos del rerun actual."""
+
+class BaseDeDatosNoDisponible(RuntimeError):
+    """La base no responde y no hay datos previos que servir."""
+
+class PoolAgotado(TimeoutError):
+    """No se libero ninguna conexion del pool a tiempo."""
+
+class PoolConexiones:
+    """
+    Pool chico de conexiones pyodbc. Cada consulta usa una conexion exclusiva:
+    pyodbc no admite sentencias concurrentes en la misma conexion (sin MARS),
+    y asi el timeout de una consulta no afecta a las de otras sesiones.
+    """
+
+    def __init__(self, conn_str: str, tamanio: int, readonly: bool = False):
+        self.conn_str = conn_str
+        self.tamanio = tamanio
+        self.readonly = readonly
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(tamanio)
+        self._abiertas = 0  # libres + prestadas (+ las que se estan abriendo)
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        with self._lock:
+            self._abiertas += 1
+        try:
+            return pyodbc.connect(
+                self.conn_str, autocommit=True, readonly=self.readonly, timeout=LOGIN_TIMEOUT
+            )
+        except BaseException:
+            with self._lock:
+                self._abiertas -= 1
+            raise
+
+    def _cerrar(self, conn):
+        with self._lock:
+            self._abiertas -= 1
+        try:
+            conn.close()
+        except pyodbc.Error:
+            pass
+
+    def abrir(self) -> int:
+        """
+        Abre conexiones hasta tener tamanio en total, contando las prestadas;
+        devuelve cuantas quedan libres.
+        """
+        while True:
+            with self._lock:
+                if self._abiertas >= self.tamanio:
+                    break
+            self._libres.put(self._conectar())
+        return self._libres.qsize()
+
+    def vaciar(self):
+        """Cierra las conexiones libres (p.ej. tras caerse el enlace)."""
+        while True:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            self._cerrar(conn)
+
+    @contextmanager
+    def conexion(self, espera: float = POOL_WAIT):
+        """Presta una conexion exclusiva; si el enlace se cayo la descarta."""
+        if not self._cupos.acquire(timeout=espera):
+            raise PoolAgotado("No hay conexiones libres a la base de datos.")
+        try:
+            try:
+                conn = self._libres.get_nowait()
+            except queue.Empty:
+                conn = self._conectar()
+            try:
+                yield conn
+            except Exception as e:
+                if _sqlstate(e) in _SQLSTATE_CONEXION:
+                    self._cerrar(conn)
+                    conn = None
+                    self.vaciar()  # las demas libres seguramente tambien quedaron rotas
+                raise
+            finally:
+                if conn is not None:
+                    with self._lock:
+                        sobra = self._abiertas > self.tamanio  # abrir() y un prestamo a la vez
+                    if sobra:
+                        self._cerrar(conn)
+                    else:
+                        self._libres.put(conn)
+        finally:
+            self._cupos.release()
+
+@st.cache_resource  # un pool por proceso
+def get_pool() -> PoolConexiones:
+    return PoolConexiones(CONN_STR, POOL_SIZE)
+
+@st.cache_resource
+def get_read_pool() -> PoolConexiones:
+    """Pool de solo lectura; usa el del primario si no hay DB_CONN_READ."""
+    if not CONN_STR_READ:
+        return get_pool()
+    return PoolConexiones(CONN_STR_READ, POOL_SIZE, readonly=True)
+
+def _marcar_escritura():
+    """Registra una escritura: por un rato todas las lecturas van al primario."""
+    global _ultima_escritura
+    _ultima_escritura = time.monotonic()
+
+def _pool_lectura():
+    """Elige el pool para leer: primario durante la ventana post-escritura."""
+    if time.monotonic() - _ultima_escritura < READ_STICKY_SECONDS:
+        return get_pool()
+    return get_read_pool()
+
+# Cache compartida entre sesiones (se limpia en cada escritura)
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+
+# Tipos compactos
+# Ids y nombres: category si se repiten (ej. Ciudad/Equipo en jugadores),
+# string de Arrow si son casi unicos; enteros chicos reducidos; fechas datetime64.
+COLS_TEXTO = {
+    "IdCiudad", "IdEquipo", "IdJugador", "IdJuego", "IdEstadistica",
+    "IdEquipoA", "IdEquipoB",
+    "NomCiudad", "NomEquipo", "NomJugador", "Ciudad", "Equipo",
+    "CiudadA", "CiudadB", "EquipoA", "EquipoB", "Jugador",
+    "DescripcionEstadistica", "DescripcionJuego",
+}
+COLS_ENTERAS = {"NumJugador", "CantEstadisticaRegistrada", "Valor"}
+COLS_FECHA = {"FechaYHoraJuego", "FechaNacimiento"}
+
+def compactar_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Convierte las columnas conocidas del esquema a tipos compactos."""
+    n = len(df)
+    for col in df.columns:
+        if col in COLS_TEXTO:
+            repetidos = n > 0 and df[col].nunique(dropna=True) <= n // 2
+            df[col] = df[col].astype("category" if repetidos else "string[pyarrow]")
+        elif col in COLS_ENTERAS and not df[col].isna().any():
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif col in COLS_FECHA:
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+# Resiliencia: deadline por rerun, reintentos y circuit breaker
+
+_rerun = threading.local()  # Streamlit corre cada sesion en su propio hilo
+
+def iniciar_rerun(deadline: float = RERUN_DEADLINE):
+    """Arranca el presupuesto de tiempo de base de datos del rerun actual."""
+    _rerun.limite = time.monotonic() + deadline
+    _rerun.obsoleto = False
+
+def datos_obsoletos() -> bool:
+    """Indica si en este rerun se sirvieron datos previos por falla de la base."""
+    return getattr(_rerun, "obsoleto", False)
+
+def _timeout(helper: str) -> int:
+    return int(os.getenv(f"DB_TIMEOUT_{helper.upper()}", QUERY_TIMEOUT))
+
+def _restante():
+    limite = getattr(_rerun, "limite", None)
+    return None if limite is None else limite - time.monotonic()
+
+def _timeout_efectivo(timeout):
+    """Recorta el timeout de la consulta al tiempo que le queda al rerun."""
+    timeout = QUERY_TIMEOUT if timeout is None else timeout
+    restante = _restante()
+    if restante is None:
+        return timeout
+    if restante <= 0:
+        raise DeadlineExcedido("Se agoto el tiempo de base de datos del rerun.")
+    return max(1, min(timeout, int(restante + 0.999)))
+
+def _sqlstate(exc) -> str:
+    # pandas envuelve el error de pyodbc en DatabaseError (queda en __cause__)
+    while exc is not None:
+        if isinstance(exc, pyodbc.Error) and exc.args:
+            return str(exc.args[0])
+        exc = exc.__cause__
+    return ""
+
+def _es_transitorio(exc) -> bool:
+    estado = _sqlstate(exc)
+    return estado in _SQLSTATE_REINTENTABLES or estado in _SQLSTATE_TIMEOUT
+
+def _es_reintentable(exc) -> bool:
+    # los timeouts no se reintentan: repetir una consulta lenta solo suma carga
+    return _sqlstate(exc) in _SQLSTATE_REINTENTABLES
+
+class _CircuitBreaker:
+    """Compartido por los hilos de script, de la API y de fondo: todo bajo lock."""
 
-@st.cache_resource  # mantiene una sola conexion por sesion
-def get_conn():
-    return pyodbc.connect(CONN_STR, autocommit=True)
+    def __init__(self, fallas: int, enfriamiento: float):
+        self.fallas_max = fallas
+        self.enfriamiento = enfriamiento
+        self.fallas = 0
+        self.abierto_hasta = 0.0
+        self.sondeo = None  # momento en que salio el intento half-open en curso
+        self.lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        """
+        Indica si se puede ir a la base. Abierto y pasado el enfriamiento deja
+        pasar un solo intento (half-open); si ese intento no vuelve en otro
+        enfriamiento se deja salir uno nuevo.
+        """
+        with self.lock:
+            if self.fallas < self.fallas_max:
+                return True
+            ahora = time.monotonic()
+            if ahora < self.abierto_hasta:
+                return False
+            if self.sondeo is not None and ahora - self.sondeo < self.enfriamiento:
+                return False
+            self.sondeo = ahora
+            return True
+
+    def falla(self):
+        with self.lock:
+            self.fallas += 1
+            self.sondeo = None
+            if self.fallas >= self.fallas_max:
+                self.abierto_hasta = time.monotonic() + self.enfriamiento
+
+    def exito(self):
+        with self.lock:
+            self.fallas = 0
+            self.sondeo = None
+
+_breaker = _CircuitBreaker(BREAKER_FAILURES, BREAKER_COOLDOWN)
+
+class _SinBase(BaseDeDatosNoDisponible):
+    """Lectura fallida por la base; _cache_con_respaldo la resuelve fuera de la cache."""
+
+def _con_timeout(fn, pool, timeout):
+    efectivo = _timeout_efectivo(timeout)
+    restante = _restante()
+    espera = POOL_WAIT if restante is None else min(POOL_WAIT, max(restante, 0))
+    with pool.conexion(espera) as conn:
+        conn.timeout = efectivo  # la conexion es exclusiva mientras dure la consulta
+        return fn(conn)
+
+def _leer(fn, timeout=None, primario=False):
+    """
+    Ejecuta una lectura con timeout y reintentos con backoff. Si la base no
+    responde lanza _SinBase (no se cachea; el respaldo se sirve afuera).
+    Con primario=True no se usa la replica.
+    """
+    if not _breaker.permitir():
+        raise _SinBase("La base de datos no esta disponible.")
+    stop = stop_after_attempt(RETRY_ATTEMPTS)
+    restante = _restante()
+    if restante is not None:
+        stop = stop | stop_after_delay(max(restante, 0))
+    try:
+        for intento in Retrying(
+            stop=stop,
+            wait=wait_random_exponential(multiplier=0.1, max=2),
+            retry=retry_if_exception(_es_reintentable),
+            reraise=True,
+        ):
+            with intento:
+                inicio = time.monotonic()
+                pool = get_pool() if primario else _pool_lectura()
+                resultado = _con_timeout(fn, pool, timeout)
+                if pool is not get_pool() and _ultima_escritura >= inicio:
+                    # hubo una escritura mientras se leia la replica: lo leido
+                    # puede ser anterior y terminaria en la cache ya invalidada
+                    resultado = _con_timeout(fn, get_pool(), timeout)
+    except (DeadlineExcedido, PoolAgotado) as e:
+        raise _SinBase(str(e)) from e
+    except Exception as e:
+        if not _es_transitorio(e):
+            _breaker.exito()  # la base respondio, aunque sea con un error
+            raise
+        _breaker.falla()
+        raise _SinBase("La base de datos no esta disponible.") from e
+    _breaker.exito()
+    return resultado
+
+def _escribir(fn, timeout=None, tablas=None):
+    """
+    Ejecuta una escritura en el primario. No se reintenta: el resultado seria
+    ambiguo. Despues descarta lo cacheado que depende de las tablas escritas.
+    """
+    if not _breaker.permitir():
+        raise BaseDeDatosNoDisponible("La base de datos no esta disponible.")
+    try:
+        resultado = _con_timeout(fn, get_pool(), timeout)
+    except Exception as e:
+        if _es_transitorio(e):
+            _breaker.falla()
+        elif _sqlstate(e):
+            _breaker.exito()  # la base respondio, aunque sea con un error
+        raise
+    _breaker.exito()
+    _marcar_escritura()
+    _invalidar_cache(tablas)
+    return resultado
 
 # Helpers genericos 
 
-def fetch_df(sql: str, params=()):
-    """Ejecuta un SELECT y devuelve un DataFrame."""
-    return pd.read_sql(sql, get_conn(), params=params)
+def fetch_df(sql: str, params=(), timeout: int = None, primario: bool = False):
+    """
+    Ejecuta un SELECT (en la conexion de lectura, o en el primario con
+    primario=True) y devuelve un DataFrame con tipos compactos.
+    """
+    return _leer(
+        lambda conn: compactar_df(pd.read_sql(sql, conn, params=params)), timeout, primario
+    )
+
+def exec_sql(sql: str, params=(), timeout: int = None, tablas=None):
+    """
+    Ejecuta una instrucción DML sin retorno de filas. tablas indica que tablas
+    modifica (para invalidar solo su cache); None invalida todo.
+    """
+    def _exec(conn):
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            # recorrer todos los resultados: pyodbc solo levanta el error de
+            # una sentencia del lote al avanzar hasta ella
+            while cur.nextset():
+                pass
+    _escribir(_exec, timeout, tablas)
+
+def exec_scalar(sql: str, params=(), timeout: int = None, tablas=None):
+    """Ejecuta un lote de escritura en el primario y devuelve el primer valor devuelto."""
+    def _exec(conn):
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            # saltar los conteos de filas que no traen resultset
+            while cur.description is None and cur.nextset():
+                pass
+            return cur.fetchone()[0]
+    return _escribir(_exec, timeout, tablas)
+
+def _invalidar_cache(tablas=None):
+    """
+    Descarta lo cacheado que depende de las tablas escritas (todo si tablas es
+    None): un registro de estadistica no tira ciudades, equipos ni jugadores.
+    """
+    if tablas is None:
+        st.cache_data.clear()
+        with _en_cache_lock:
+            _en_cache.clear()
+    else:
+        for nombre, dependencias in DEPENDENCIAS.items():
+            if dependencias & set(tablas):
+                CACHEADOS[nombre].clear()
+    _snapshots.invalidar(tablas)
+
+_en_cache = {}  # (helper, argumentos) -> (momento, filas, bytes) de lo que guardo la cache
+_en_cache_lock = threading.Lock()
+
+def _cache_medido(fn):
+    """
+    st.cache_data que ademas anota filas y bytes de cada entrada que guarda,
+    para reporte_memoria() sin volver a llamar a los helpers.
+    """
+    @functools.wraps(fn)
+    def medida(*args):
+        resultado = fn(*args)
+        dfs = resultado if isinstance(resultado, tuple) else (resultado,)
+        with _en_cache_lock:
+            _en_cache[(fn.__name__, args)] = (
+                time.monotonic(),
+                sum(len(df) for df in dfs),
+                sum(int(df.memory_usage(deep=True).sum()) for df in dfs),
+            )
+        return resultado
+
+    cacheada = st.cache_data(ttl=CACHE_TTL, show_spinner=False)(medida)
+    vaciar = cacheada.clear
+
+    def clear():
+        vaciar()
+        with _en_cache_lock:
+            for clave in [k for k in _en_cache if k[0] == fn.__name__]:
+                del _en_cache[clave]
+
+    cacheada.clear = clear
+    return cacheada
+
+_ultimos = OrderedDict()  # (helper, argumentos) -> ultimo resultado bueno, LRU
+_ultimos_lock = threading.Lock()
+
+def _cache_con_respaldo(fn):
+    """
+    st.cache_data con respaldo. Si la base no responde se devuelve el ultimo
+    resultado bueno desde afuera de la cache, asi el respaldo nunca queda
+    cacheado para las demas sesiones. Se guardan hasta RESPALDOS_MAX.
+    """
+    cacheada = _cache_medido(fn)
+
+    @functools.wraps(fn)
+    def envoltura(*args):
+        clave = (fn.__name__, args)
+        try:
+            resultado = cacheada(*args)
+        except _SinBase:
+            with _ultimos_lock:
+                if clave not in _ultimos:
+                    raise
+                _rerun.obsoleto = True
+                return _ultimos[clave]
+        with _ultimos_lock:
+            _ultimos[clave] = resultado
+            _ultimos.move_to_end(clave)
+            while len(_ultimos) > RESPALDOS_MAX:
+                _ultimos.popitem(last=False)
+        return resultado
+
+    envoltura.clear = cacheada.clear
+    return envoltura
+
+# Snapshots en disco de los datasets de referencia (arranque en caliente)
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", ".snapshots")
+# Segundos que las requests pueden esperar la validacion, en total desde el arranque
+SNAPSHOT_WAIT = float(os.getenv("SNAPSHOT_WAIT", "3"))
+# Segundos entre revisiones de firmas para reescribir snapshots
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "600"))
+
+_snapshots = snapshots.Almacen(SNAPSHOT_DIR, SNAPSHOT_WAIT)
+
+def _firmas_actuales(tablas) -> dict:
+    df = fetch_df(snapshots.sql_firmas(tablas))
+    return {r.Tabla: f"{r.Filas}:{r.Checksum}" for r in df.itertuples()}
 
-def exec_sql(sql: str, params=()):
-    """Ejecuta una instrucción DML sin retorno de filas."""
-    with get_conn().cursor() as cur:
-        cur.execute(sql, params)
+def _persistir_snapshots():
+    """Reescribe los snapshots cuyas tablas cambiaron desde la ultima escritura."""
+    firmas = _firmas_actuales(sorted({t for ts in snapshots.TABLAS.values() for t in ts}))
+    for nombre, consulta in CONSULTAS_REFERENCIA.items():
+        # la firma se toma antes de los datos: si cambian en medio, no coincidira
+        firma = snapshots.firma(nombre, firmas)
+        if _snapshots.en_disco.get(nombre) != firma:
+            _snapshots.guardar(nombre, consulta(), firma)
+
+def _mantener_snapshots():
+    _snapshots.validar(_firmas_actuales)
+    while True:
+        try:
+            _persistir_snapshots()
+        except Exception as e:
+            # base caida o disco lleno: se reintenta en la proxima vuelta
+            log.warning("no se pudieron actualizar los snapshots: %s", e)
+        time.sleep(SNAPSHOT_INTERVAL)
+
+@st.cache_resource  # una sola vez por proceso
+def iniciar_snapshots() -> snapshots.Almacen:
+    """
+    Carga los snapshots del disco y lanza el hilo que los valida contra la
+    base y despues los mantiene al dia cada SNAPSHOT_INTERVAL segundos.
+    """
+    _snapshots.cargar()
+    threading.Thread(target=_mantener_snapshots, name="snapshots", daemon=True).start()
+    return _snapshots
+
+def _referencia(nombre: str, consulta):
+    """
+    Devuelve un dataset de referencia: el snapshot validado si existe (solo la
+    primera carga), si no la consulta. Los snapshots se escriben en segundo plano.
+    """
+    tabla = _snapshots.obtener(nombre)
+    if tabla is not None:
+        return compactar_df(tabla.to_pandas())  # mismos tipos que la consulta
+    return consulta()
 
 # Helper - CIUDAD
 
@@ -31,21 +533,30 @@ def insert_ciudad(nombre: str) -> str:
         EXEC dbo.CiudadInsert @NomCiudad = ?, @IdCiudad = @newId OUTPUT;
         SELECT @newId AS IdCiudad;
     """
-    return fetch_df(sql, (nombre,)).iloc[0, 0]
+    return exec_scalar(sql, (nombre,), tablas=("Ciudad",))
+
+def _consulta_ciudades() -> pd.DataFrame:
+    return fetch_df(
+        "SELECT IdCiudad, NomCiudad FROM dbo.Ciudad ORDER BY IdCiudad",
+        timeout=_timeout("list_ciudades"),
+    )
 
+@_cache_con_respaldo
 def list_ciudades() -> pd.DataFrame:
-    return fetch_df("SELECT IdCiudad, NomCiudad FROM dbo.Ciudad ORDER BY IdCiudad")
+    return _referencia("ciudades", _consulta_ciudades)
 
 def update_ciudad(id_ciudad: str, nuevo_nombre: str):
     exec_sql(
         "UPDATE dbo.Ciudad SET NomCiudad = ? WHERE IdCiudad = ?",
         (nuevo_nombre, id_ciudad),
+        tablas=("Ciudad",),
     )
 
 def delete_ciudad(id_ciudad: str):
     exec_sql(
         "DELETE FROM dbo.Ciudad WHERE IdCiudad = ?",
         (id_ciudad,),
+        tablas=("Ciudad",),
     )
 
 # Helper - ESTADISTICA
@@ -58,23 +569,30 @@ def insert_estadistica(descripcion: str, valor: int) -> str:
                                    @IdEstadistica = @newId OUTPUT;
         SELECT @newId AS IdEstadistica;
     """
-    return fetch_df(sql, (descripcion, valor)).iloc[0, 0]
+    return exec_scalar(sql, (descripcion, valor), tablas=("Estadistica",))
 
-def list_estadisticas() -> pd.DataFrame:
+def _consulta_estadisticas() -> pd.DataFrame:
     return fetch_df(
-        "SELECT IdEstadistica, DescripcionEstadistica, Valor FROM dbo.Estadistica ORDER BY IdEstadistica"
+        "SELECT IdEstadistica, DescripcionEstadistica, Valor FROM dbo.Estadistica ORDER BY IdEstadistica",
+        timeout=_timeout("list_estadisticas"),
     )
 
+@_cache_con_respaldo
+def list_estadisticas() -> pd.DataFrame:
+    return _referencia("estadisticas", _consulta_estadisticas)
+
 def update_estadistica(id_est: str, nueva_desc: str, nuevo_valor: int):
     exec_sql(
         "UPDATE dbo.Estadistica SET DescripcionEstadistica = ?, Valor = ? WHERE IdEstadistica = ?",
         (nueva_desc, nuevo_valor, id_est),
+        tablas=("Estadistica",),
     )
 
 def delete_estadistica(id_est: str):
     exec_sql(
         "DELETE FROM dbo.Estadistica WHERE IdEstadistica = ?",
         (id_est,),
+        tablas=("Estadistica",),
     )
 
 # Helper - EQUIPO
@@ -84,32 +602,40 @@ def insert_equipo(nom_equipo: str, id_ciudad: str) -> str:
         EXEC dbo.EquipoInsert @NomEquipo = ?, @IdCiudad = ?, @IdEquipo = @newId OUTPUT;
         SELECT @newId AS IdEquipo;
     """
-    return fetch_df(sql, (nom_equipo, id_ciudad)).iloc[0, 0]
+    return exec_scalar(sql, (nom_equipo, id_ciudad), tablas=("Equipo",))
 
-def list_equipos() -> pd.DataFrame:
+def _consulta_equipos() -> pd.DataFrame:
     return fetch_df(
         """
-        SELECT e.IdEquipo, e.NomEquipo, c.NomCiudad AS Ciudad
+        SELECT e.IdEquipo, e.NomEquipo, e.IdCiudad, c.NomCiudad AS Ciudad
         FROM dbo.Equipo e
         JOIN dbo.Ciudad c ON e.IdCiudad = c.IdCiudad
         ORDER BY e.IdEquipo
-        """
+        """,
+        timeout=_timeout("list_equipos"),
     )
+
+@_cache_con_respaldo
+def list_equipos() -> pd.DataFrame:
+    return _referencia("equipos", _consulta_equipos)
+
 def update_equipo(id_equipo: str, nom_equipo: str, id_ciudad: str):
     exec_sql(
         "UPDATE dbo.Equipo SET NomEquipo = ?, IdCiudad = ? WHERE IdEquipo = ?",
         (nom_equipo, id_ciudad, id_equipo),
+        tablas=("Equipo",),
     )
 
 def delete_equipo(id_equipo: str):
     exec_sql(
         "DELETE FROM dbo.Equipo WHERE IdEquipo = ?",
         (id_equipo,),
+        tablas=("Equipo",),
     )
 
 # Helper - JUGADOR
 
-def list_jugadores() -> pd.DataFrame:
+def _consulta_jugadores() -> pd.DataFrame:
     return fetch_df(
         """
         SELECT j.IdJugador, j.NomJugador, j.IdCiudad, c.NomCiudad AS Ciudad,
@@ -118,9 +644,14 @@ def list_jugadores() -> pd.DataFrame:
         JOIN dbo.Ciudad c ON j.IdCiudad=c.IdCiudad
         JOIN dbo.Equipo e ON j.IdEquipo=e.IdEquipo
         ORDER BY j.IdJugador
-        """
+        """,
+        timeout=_timeout("list_jugadores"),
     )
 
+@_cache_con_respaldo
+def list_jugadores() -> pd.DataFrame:
+    return _referencia("jugadores", _consulta_jugadores)
+
 def insert_jugador(nom_jugador: str, id_ciudad: str, fecha_nac, num_jugador: int, id_equipo: str) -> str:
     sql = """
         DECLARE @newId CHAR(5);
@@ -133,26 +664,68 @@ def insert_jugador(nom_jugador: str, id_ciudad: str, fecha_nac, num_jugador: int
             @IdJugador = @newId OUTPUT;
         SELECT @newId AS IdJugador;
     """
-    return fetch_df(sql, (nom_jugador, id_ciudad, fecha_nac, num_jugador, id_equipo)).iloc[0, 0]
+    return exec_scalar(
+        sql, (nom_jugador, id_ciudad, fecha_nac, num_jugador, id_equipo), tablas=("Jugador",)
+    )
 
 def update_jugador(id_jugador: str, nom_jugador: str, id_ciudad: str, fecha_nac, num_jugador: int, id_equipo: str):
     exec_sql(
         "UPDATE dbo.Jugador SET NomJugador = ?, IdCiudad = ?, FechaNacimiento = ?, NumJugador = ?, IdEquipo = ? WHERE IdJugador = ?",
-        (nom_jugador, id_ciudad, fecha_nac, num_jugador, id_equipo, id_jugador)
+        (nom_jugador, id_ciudad, fecha_nac, num_jugador, id_equipo, id_jugador),
+        tablas=("Jugador",),
     )
 
 def delete_jugador(id_jugador: str):
-    exec_sql("DELETE FROM dbo.Jugador WHERE IdJugador = ?", (id_jugador,))
+    exec_sql("DELETE FROM dbo.Jugador WHERE IdJugador = ?", (id_jugador,), tablas=("Jugador",))
 
 # Helper – JUEGO
 
-def list_juegos() -> pd.DataFrame:
+def _consulta_juegos() -> pd.DataFrame:
     return fetch_df(
         """
         SELECT IdJuego, DescripcionJuego, IdEquipoA, IdEquipoB, FechaYHoraJuego
         FROM dbo.Juego
         ORDER BY IdJuego
+        """,
+        timeout=_timeout("list_juegos"),
+    )
+
+@_cache_con_respaldo
+def list_juegos() -> pd.DataFrame:
+    return _referencia("juegos", _consulta_juegos)
+
+@_cache_con_respaldo
+def list_juegos_detalle() -> pd.DataFrame:
+    """
+    Lista los juegos con nombre y ciudad de ambos equipos y el marcador.
+    Los puntos se agregan en la misma consulta (SUM(Cantidad * Valor) por
+    juego y equipo), sin ejecutar el sp_EstadisticasDelJuego.
+    """
+    return fetch_df(
         """
+        WITH Puntos AS (
+            SELECT ej.IdJuego, jg.IdEquipo,
+                   SUM(ej.CantEstadisticaRegistrada * es.Valor) AS Puntos
+            FROM dbo.EstadisticaJuego ej
+            JOIN dbo.Jugador jg ON ej.IdJugador = jg.IdJugador
+            JOIN dbo.Estadistica es ON ej.IdEstadistica = es.IdEstadistica
+            GROUP BY ej.IdJuego, jg.IdEquipo
+        )
+        SELECT j.IdJuego, j.DescripcionJuego, j.FechaYHoraJuego,
+               j.IdEquipoA, ea.NomEquipo AS EquipoA, ca.NomCiudad AS CiudadA,
+               j.IdEquipoB, eb.NomEquipo AS EquipoB, cb.NomCiudad AS CiudadB,
+               COALESCE(pa.Puntos, 0) AS PuntosA,
+               COALESCE(pb.Puntos, 0) AS PuntosB
+        FROM dbo.Juego j
+        JOIN dbo.Equipo ea ON j.IdEquipoA = ea.IdEquipo
+        JOIN dbo.Ciudad ca ON ea.IdCiudad = ca.IdCiudad
+        JOIN dbo.Equipo eb ON j.IdEquipoB = eb.IdEquipo
+        JOIN dbo.Ciudad cb ON eb.IdCiudad = cb.IdCiudad
+        LEFT JOIN Puntos pa ON pa.IdJuego = j.IdJuego AND pa.IdEquipo = j.IdEquipoA
+        LEFT JOIN Puntos pb ON pb.IdJuego = j.IdJuego AND pb.IdEquipo = j.IdEquipoB
+        ORDER BY j.IdJuego
+        """,
+        timeout=_timeout("list_juegos_detalle"),
     )
 
 def insert_juego(id_equipoA: str, id_equipoB: str, fecha_hora) -> str:
@@ -165,7 +738,7 @@ def insert_juego(id_equipoA: str, id_equipoB: str, fecha_hora) -> str:
             @IdJuego         = @newId OUTPUT;
         SELECT @newId AS IdJuego;
     """
-    return fetch_df(sql, (id_equipoA, id_equipoB, fecha_hora)).iloc[0, 0]
+    return exec_scalar(sql, (id_equipoA, id_equipoB, fecha_hora), tablas=("Juego",))
 
 def update_juego(id_juego: str, id_equipoA: str, id_equipoB: str, fecha_hora) -> None:
     sql = """
@@ -190,40 +763,44 @@ def update_juego(id_juego: str, id_equipoA: str, id_equipoB: str, fecha_hora) ->
         id_equipoA,
         id_equipoB,
         id_juego,
-    ))
+    ), tablas=("Juego",))
 
 def delete_juego(id_juego: str):
     exec_sql(
         "DELETE FROM dbo.Juego WHERE IdJuego = ?",
         (id_juego,),
+        tablas=("Juego",),
     )
 
 # Helper - JUEGO (SP Estadisticas)
 
+@_cache_con_respaldo
 def get_estadisticas_juego(id_juego: str):
     """
     Ejecuta el sp_EstadisticasDelJuego y devuelve dos DataFrames:
      - df_local: detalle (jugadores + total) del equipo local
      - df_visit: detalle (jugadores + total) del equipo visitante
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("EXEC dbo.sp_EstadisticasDelJuego ?", id_juego)
+    def _ejecutar_sp(conn):
+        with conn.cursor() as cur:
+            cur.execute("EXEC dbo.sp_EstadisticasDelJuego ?", id_juego)
 
-    # Primer resultset -> stats del equipo local
-    cols = [col[0] for col in cur.description]
-    rows = cur.fetchall()
-    df_local = pd.DataFrame.from_records(rows, columns=cols)
+            # Primer resultset -> stats del equipo local
+            cols = [col[0] for col in cur.description]
+            rows = cur.fetchall()
+            df_local = compactar_df(pd.DataFrame.from_records(rows, columns=cols))
 
-    # Segundo resultset -> stats del equipo visitante
-    if cur.nextset():
-        cols = [col[0] for col in cur.description]
-        rows = cur.fetchall()
-        df_visit = pd.DataFrame.from_records(rows, columns=cols)
-    else:
-        df_visit = pd.DataFrame(columns=cols)
+            # Segundo resultset -> stats del equipo visitante
+            if cur.nextset():
+                cols = [col[0] for col in cur.description]
+                rows = cur.fetchall()
+                df_visit = compactar_df(pd.DataFrame.from_records(rows, columns=cols))
+            else:
+                df_visit = pd.DataFrame(columns=cols)
+
+        return df_local, df_visit
 
-    return df_local, df_visit
+    return _leer(_ejecutar_sp, _timeout("get_estadisticas_juego"))
 
 
 # Helper - ESTADISTICA_JUEGO (INSERT)
@@ -235,4 +812,231 @@ def insert_estadistica_juego(id_juego: str, id_estadistica: str, id_jugador: str
         VALUES (?, ?, ?, ?)
         """,
         (id_juego, id_estadistica, id_jugador, cantidad),
+        tablas=("EstadisticaJuego",),
+    )
+
+
+# Helper - OPERACIONES MASIVAS
+
+# Tablas editables en bloque: Id y su tipo, columnas editables con su tipo SQL,
+# tablas hijas que impiden borrar y tablas padre de las columnas FK.
+TABLAS_MASIVAS = {
+    "Ciudad": {
+        "id": ("IdCiudad", "CHAR(3)"),
+        "columnas": {"NomCiudad": "NVARCHAR(60)"},
+        "hijos": [("Equipo", "IdCiudad"), ("Jugador", "IdCiudad")],
+        "padres": {},
+    },
+    "Estadistica": {
+        "id": ("IdEstadistica", "CHAR(2)"),
+        "columnas": {"DescripcionEstadistica": "NVARCHAR(60)", "Valor": "INT"},
+        "hijos": [("EstadisticaJuego", "IdEstadistica")],
+        "padres": {},
+    },
+    "Equipo": {
+        "id": ("IdEquipo", "CHAR(3)"),
+        "columnas": {"NomEquipo": "NVARCHAR(60)", "IdCiudad": "CHAR(3)"},
+        "hijos": [("Jugador", "IdEquipo"), ("Juego", "IdEquipoA"), ("Juego", "IdEquipoB")],
+        "padres": {"IdCiudad": ("Ciudad", "IdCiudad")},
+    },
+    "Jugador": {
+        "id": ("IdJugador", "CHAR(5)"),
+        "columnas": {
+            "NomJugador": "NVARCHAR(60)",
+            "IdCiudad": "CHAR(3)",
+            "FechaNacimiento": "DATE",
+            "NumJugador": "INT",
+            "IdEquipo": "CHAR(3)",
+        },
+        "hijos": [("EstadisticaJuego", "IdJugador")],
+        "padres": {"IdCiudad": ("Ciudad", "IdCiudad"), "IdEquipo": ("Equipo", "IdEquipo")},
+    },
+    "Juego": {
+        "id": ("IdJuego", "CHAR(5)"),
+        "columnas": {"FechaYHoraJuego": "DATETIME"},
+        "hijos": [("EstadisticaJuego", "IdJuego")],
+        "padres": {},
+    },
+}
+
+def _json_ids(ids) -> str:
+    return json.dumps([str(i) for i in ids])
+
+def _valor_json(valor, tipo: str):
+    # ISO 8601 ('YYYY-MM-DD' y 'YYYY-MM-DDThh:mm:ss.mmm') no depende de SET DATEFORMAT
+    if valor is None:
+        return None
+    if tipo == "DATE":
+        return pd.Timestamp(valor).date().isoformat()
+    if tipo == "DATETIME":
+        return pd.Timestamp(valor).isoformat(timespec="milliseconds")
+    return valor
+
+def _json_filas(df: pd.DataFrame, tipos: dict) -> str:
+    filas = df.astype(object).where(df.notna(), None).to_dict("records")
+    filas = [{c: _valor_json(v, tipos.get(c, "")) for c, v in f.items()} for f in filas]
+    return json.dumps(filas, default=str)
+
+def largo_maximo(tipo: str):
+    """Largo de un NVARCHAR(n)/CHAR(n), o None si el tipo no es de texto."""
+    if "CHAR(" not in tipo:
+        return None
+    return int(tipo.split("(", 1)[1].rstrip(")"))
+
+def _validar_largos(spec: dict, df: pd.DataFrame):
+    """Evita que SQL Server trunque en silencio textos mas largos que la columna."""
+    for c, tipo in spec["columnas"].items():
+        largo = largo_maximo(tipo)
+        if largo is None or c not in df.columns:
+            continue
+        textos = df[c].dropna().astype(str)
+        largos = textos[textos.str.len() > largo]
+        if not largos.empty:
+            raise ValueError(f"{c} admite hasta {largo} caracteres: '{largos.iloc[0]}'")
+
+def _with_openjson(spec: dict, cols) -> str:
+    id_col, id_tipo = spec["id"]
+    return ", ".join([f"{id_col} {id_tipo}"] + [f"{c} {spec['columnas'][c]}" for c in cols])
+
+def conflictos_masivos(tabla: str, ids_eliminar, df_cambios: pd.DataFrame) -> pd.DataFrame:
+    """
+    Revisa antes de aplicar una operacion masiva:
+     - Ids a eliminar que siguen referenciados en tablas hijas
+     - filas modificadas cuyas llaves foraneas no existen en la tabla padre
+    Devuelve un DataFrame (Id, Problema); vacio si no hay conflictos.
+    """
+    spec = TABLAS_MASIVAS[tabla]
+    id_col, id_tipo = spec["id"]
+    partes = []
+
+    if len(ids_eliminar) and spec["hijos"]:
+        union = "\nUNION ALL\n".join(
+            f"""SELECT h.{col} AS Id,
+                   CONCAT('Referenciado ', COUNT(*), ' vez/veces en {hija}.{col}') AS Problema
+            FROM dbo.{hija} h JOIN ids ON h.{col} = ids.Id
+            GROUP BY h.{col}"""
+            for hija, col in spec["hijos"]
+        )
+        partes.append(fetch_df(
+            f"""
+            WITH ids AS (SELECT CAST(value AS {id_tipo}) AS Id FROM OPENJSON(?))
+            {union}
+            """,
+            (_json_ids(ids_eliminar),),
+            primario=True,  # la replica puede no tener las filas recien escritas
+        ))
+
+    padres = {c: p for c, p in spec["padres"].items() if c in df_cambios.columns}
+    if not df_cambios.empty and padres:
+        union = "\nUNION ALL\n".join(
+            f"""SELECT n.{id_col} AS Id,
+                   CONCAT('{col} ', n.{col}, ' no existe en {padre}') AS Problema
+            FROM n LEFT JOIN dbo.{padre} p ON p.{col_padre} = n.{col}
+            WHERE p.{col_padre} IS NULL"""
+            for col, (padre, col_padre) in padres.items()
+        )
+        partes.append(fetch_df(
+            f"""
+            WITH n AS (SELECT * FROM OPENJSON(?) WITH ({_with_openjson(spec, padres)}))
+            {union}
+            """,
+            (_json_filas(df_cambios[[id_col, *padres]], spec["columnas"]),),
+            primario=True,
+        ))
+
+    if not partes:
+        return pd.DataFrame(columns=["Id", "Problema"])
+    return pd.concat(partes, ignore_index=True)
+
+def aplicar_masivo(tabla: str, ids_eliminar, df_cambios: pd.DataFrame):
+    """
+    Aplica en una sola transaccion un UPDATE (filas de df_cambios) y un DELETE
+    (ids_eliminar) set-based sobre la tabla, pasando las filas como JSON.
+    """
+    spec = TABLAS_MASIVAS[tabla]
+    id_col, id_tipo = spec["id"]
+    sentencias, params = [], []
+
+    if not df_cambios.empty:
+        _validar_largos(spec, df_cambios)
+        cols = [c for c in spec["columnas"] if c in df_cambios.columns]
+        sets = ", ".join(f"t.{c} = n.{c}" for c in cols)
+        sentencias.append(
+            f"""UPDATE t SET {sets}
+            FROM dbo.{tabla} t
+            JOIN OPENJSON(?) WITH ({_with_openjson(spec, cols)}) AS n
+              ON n.{id_col} = t.{id_col};"""
+        )
+        params.append(_json_filas(df_cambios[[id_col, *cols]], spec["columnas"]))
+
+    if len(ids_eliminar):
+        sentencias.append(
+            f"""DELETE FROM dbo.{tabla}
+            WHERE {id_col} IN (SELECT CAST(value AS {id_tipo}) FROM OPENJSON(?));"""
+        )
+        params.append(_json_ids(ids_eliminar))
+
+    if not sentencias:
+        return
+    exec_sql(
+        "SET NOCOUNT ON;\nSET XACT_ABORT ON;\nBEGIN TRAN;\n"
+        + "\n".join(sentencias)
+        + "\nCOMMIT TRAN;",
+        tuple(params),
+        tablas=(tabla,),
+    )
+
+
+# Helper - MEMORIA
+
+# Dataset de referencia -> consulta sin cache (para escribir su snapshot)
+CONSULTAS_REFERENCIA = {
+    "ciudades": _consulta_ciudades,
+    "estadisticas": _consulta_estadisticas,
+    "equipos": _consulta_equipos,
+    "jugadores": _consulta_jugadores,
+    "juegos": _consulta_juegos,
+}
+
+# Listados de referencia (los precarga el warm-up)
+DATASETS = {
+    "ciudades": list_ciudades,
+    "estadisticas": list_estadisticas,
+    "equipos": list_equipos,
+    "jugadores": list_jugadores,
+    "juegos": list_juegos,
+    "juegos_detalle": list_juegos_detalle,
+}
+
+# Todo lo cacheado y las tablas de las que depende (para invalidar solo lo afectado)
+CACHEADOS = {**DATASETS, "estadisticas_juego": get_estadisticas_juego}
+DEPENDENCIAS = {
+    "ciudades": {"Ciudad"},
+    "estadisticas": {"Estadistica"},
+    "equipos": {"Equipo", "Ciudad"},
+    "jugadores": {"Jugador", "Ciudad", "Equipo"},
+    "juegos": {"Juego"},
+    "juegos_detalle": {"Juego", "Equipo", "Ciudad", "Jugador", "Estadistica", "EstadisticaJuego"},
+    "estadisticas_juego": {"Juego", "Equipo", "Jugador", "Estadistica", "EstadisticaJuego"},
+}
+
+def reporte_memoria() -> pd.DataFrame:
+    """
+    Devuelve entradas, filas y bytes (deep) de lo que hay en la cache, por
+    helper. Lee lo anotado al cachear: no ejecuta consultas.
+    """
+    nombres = {fn.__name__: nombre for nombre, fn in CACHEADOS.items()}
+    vigentes = time.monotonic() - CACHE_TTL
+    totales = {}
+    with _en_cache_lock:
+        for (helper, _), (momento, filas, bytes_) in _en_cache.items():
+            if momento < vigentes:
+                continue  # ya vencio en la cache
+            fila = totales.setdefault(nombres[helper], [0, 0, 0])
+            fila[0] += 1
+            fila[1] += filas
+            fila[2] += bytes_
+    return pd.DataFrame(
+        [(nombre, *valores) for nombre, valores in totales.items()],
+        columns=["Dataset", "Entradas", "Filas", "Bytes"],
     )
@@ -0,0 +1,318 @@
+"""
+Prueba de carga: N sesiones simuladas recorriendo los flujos reales de app.main()
+contra UN servidor `streamlit run`, hablando su protocolo WebSocket
+(/_stcore/stream, mensajes protobuf BackMsg/ForwardMsg) como lo hace el
+navegador.
+
+Que miden los numeros: cuantas sesiones aguanta un solo servidor. Todas las
+sesiones comparten el proceso de Streamlit, sus hilos de script, las caches,
+el pool de conexiones, el warm-up y el hilo de snapshots, igual que en
+produccion. La latencia de un rerun va desde que se manda el BackMsg hasta
+que llega script_finished (sin el render del navegador). Los clientes corren
+en un solo hilo con asyncio y casi no consumen CPU.
+
+Apuntar a una base local de prueba, nunca a la de produccion: los flujos de
+escritura insertan ciudades y estadisticas de juego.
+
+Uso:
+    python loadtest.py --db "DRIVER={ODBC Driver 18 for SQL Server};SERVER=(localdb)\\MSSQLLocalDB;..." \\
+        --sesiones 20 --duracion 60
+    python loadtest.py --url http://localhost:8501 --sesiones 50 --duracion 30 --solo-lectura
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from urllib.request import urlopen
+
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+PAGINAS = [
+    "🏙️ CRUD Ciudad",
+    "📊 CRUD Estadística",
+    "⚽ CRUD Equipo",
+    "🎮 CRUD Jugador",
+    "🎲 CRUD Juego",
+    "📈 Estadísticas Juego",
+    "➕ Agregar Estadística Juego",
+    "🏆 Tabla de Posiciones",
+]
+
+
+class Metricas:
+    """Latencias por rerun y errores por flujo de todas las sesiones."""
+
+    def __init__(self):
+        self.latencias = []
+        self.por_flujo = defaultdict(lambda: {"ok": 0, "error": 0})
+        self.errores = defaultdict(int)
+
+    def rerun(self, segundos: float):
+        self.latencias.append(segundos)
+
+    def flujo(self, nombre: str, error: str = None):
+        self.por_flujo[nombre]["error" if error else "ok"] += 1
+        if error:
+            self.errores[f"{nombre}: {error[:80]}"] += 1
+
+
+class Sesion:
+    """
+    Una sesion del navegador: guarda el estado de los widgets que toco, lo
+    manda completo en cada rerun y reconstruye los elementos de la pagina.
+    """
+
+    def __init__(self, metricas: Metricas, url: str, timeout: float):
+        self.metricas = metricas
+        self.url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+        self.timeout = timeout
+        self.ws = None
+        self.estados = {}    # id de widget -> WidgetState
+        self.elementos = {}  # delta path -> Element del ultimo rerun
+
+    async def conectar(self):
+        # el primer subprotocolo debe ser "streamlit" (ver select_subprotocol del servidor)
+        self.ws = await websocket_connect(self.url, subprotocols=["streamlit"])
+        await self.run()
+
+    def cerrar(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def run(self, disparo: WidgetState = None):
+        msg = BackMsg()
+        estado = msg.rerun_script
+        estado.widget_states.widgets.extend(self.estados.values())
+        if disparo is not None:
+            estado.widget_states.widgets.append(disparo)
+        self.elementos = {}
+
+        inicio = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        await asyncio.wait_for(self._esperar_fin(), self.timeout)
+        self.metricas.rerun(time.perf_counter() - inicio)
+
+        for el in self.elementos.values():
+            tipo = el.WhichOneof("type")
+            if tipo == "exception":
+                raise RuntimeError(el.exception.message)
+            if tipo == "alert" and el.alert.format == Alert.ERROR:
+                raise RuntimeError(el.alert.body)
+
+    async def _esperar_fin(self):
+        while True:
+            datos = await self.ws.read_message()
+            if datos is None:
+                raise ConnectionError("el servidor cerro el WebSocket")
+            fwd = ForwardMsg()
+            fwd.ParseFromString(datos)
+            tipo = fwd.WhichOneof("type")
+            if tipo == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                self.elementos[tuple(fwd.metadata.delta_path)] = fwd.delta.new_element
+            elif tipo == "script_finished":
+                if fwd.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    self.elementos = {}  # st.rerun(): sigue otra corrida
+                    continue
+                if fwd.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("error de compilacion en app.py")
+                return
+
+    def widgets(self, tipo: str) -> list:
+        """Widgets de un tipo en el orden de la pagina."""
+        return [
+            getattr(el, tipo) for _, el in sorted(self.elementos.items())
+            if el.WhichOneof("type") == tipo
+        ]
+
+    def _widget(self, tipo: str, etiqueta: str):
+        return next(w for w in self.widgets(tipo) if w.label == etiqueta)
+
+    def _fijar(self, id_: str, **valor):
+        self.estados[id_] = WidgetState(id=id_, **valor)
+
+    async def ir_a(self, pagina: str):
+        radio = self._widget("radio", "Menú principal")
+        self._fijar(radio.id, int_value=list(radio.options).index(pagina))
+        await self.run()
+
+    async def click(self, etiqueta: str):
+        boton = self._widget("button", etiqueta)
+        await self.run(WidgetState(id=boton.id, trigger_value=True))
+
+    async def elegir(self, selectbox):
+        if selectbox.options:
+            self._fijar(selectbox.id, string_value=random.choice(list(selectbox.options)))
+            await self.run()
+
+    def escribir(self, etiqueta: str, texto: str):
+        self._fijar(self._widget("text_input", etiqueta).id, string_value=texto)
+
+    def numero(self, etiqueta: str, valor: float):
+        self._fijar(self._widget("number_input", etiqueta).id, double_value=valor)
+
+
+# Flujos ==============================
+
+async def navegar(s: Sesion):
+    for pagina in random.sample(PAGINAS, 3):
+        await s.ir_a(pagina)
+
+
+async def ver_estadisticas(s: Sesion):
+    await s.ir_a("📈 Estadísticas Juego")
+    if s.widgets("selectbox"):
+        await s.elegir(s.widgets("selectbox")[0])
+
+
+async def abrir_formularios(s: Sesion):
+    await s.ir_a("🎮 CRUD Jugador")
+    await s.click("✏️ Modificar Jugador")
+    if s.widgets("selectbox"):
+        await s.elegir(s.widgets("selectbox")[0])
+    await s.click("✏️ Modificar Jugador")  # cerrar
+
+
+async def insertar_ciudad(s: Sesion):
+    await s.ir_a("🏙️ CRUD Ciudad")
+    await s.click("➕ Insertar Ciudad")
+    s.escribir("Nombre de la ciudad", f"LT {uuid.uuid4().hex[:8]}")
+    await s.click("Guardar")
+
+
+async def agregar_estadistica(s: Sesion):
+    await s.ir_a("➕ Agregar Estadística Juego")
+    if len(s.widgets("selectbox")) < 4:
+        return  # juego sin jugadores
+    await s.elegir(s.widgets("selectbox")[0])
+    if len(s.widgets("selectbox")) < 4:
+        return
+    s.numero("Cantidad registrada", 1)
+    await s.click("Agregar estadística")
+
+
+LECTURAS = [(navegar, 4), (ver_estadisticas, 4), (abrir_formularios, 2)]
+ESCRITURAS = [(insertar_ciudad, 1), (agregar_estadistica, 1)]
+
+
+async def trabajador(metricas: Metricas, url: str, flujos, fin: float, timeout: float):
+    sesion = Sesion(metricas, url, timeout)
+    try:
+        await sesion.conectar()
+    except Exception as e:
+        metricas.flujo("inicio", str(e) or type(e).__name__)
+        sesion.cerrar()
+        return
+    funciones, pesos = zip(*flujos)
+    try:
+        while time.monotonic() < fin:
+            flujo = random.choices(funciones, weights=pesos)[0]
+            try:
+                await flujo(sesion)
+                metricas.flujo(flujo.__name__)
+            except Exception as e:
+                metricas.flujo(flujo.__name__, str(e) or type(e).__name__)
+                if sesion.ws.close_code is not None:
+                    return  # se cayo la conexion: la sesion termina
+    finally:
+        sesion.cerrar()
+
+
+async def carga(url: str, args, flujos) -> Metricas:
+    metricas = Metricas()
+    fin = time.monotonic() + args.rampa + args.duracion
+    tareas = []
+    for _ in range(args.sesiones):
+        tareas.append(asyncio.create_task(trabajador(metricas, url, flujos, fin, args.timeout)))
+        await asyncio.sleep(args.rampa / max(args.sesiones, 1))
+    await asyncio.gather(*tareas)
+    return metricas
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_servidor(espera: float = 60):
+    """Arranca `streamlit run app.py` en un puerto libre y espera a que responda."""
+    puerto = _puerto_libre()
+    proceso = subprocess.Popen([
+        sys.executable, "-m", "streamlit", "run", APP,
+        "--server.headless=true", f"--server.port={puerto}", "--server.address=127.0.0.1",
+        "--browser.gatherUsageStats=false",
+    ])
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("streamlit run termino antes de responder")
+        try:
+            with urlopen(url + "/_stcore/health", timeout=1):
+                return proceso, url
+        except OSError:
+            time.sleep(0.5)
+    proceso.terminate()
+    raise RuntimeError(f"streamlit run no respondio en {espera:.0f}s")
+
+
+def reporte(metricas: Metricas, duracion: float, sesiones: int):
+    lat = sorted(x * 1000 for x in metricas.latencias)
+    print(f"\n{sesiones} sesiones en un servidor, {duracion:.1f}s, {len(lat)} reruns")
+    if len(lat) > 1:
+        q = statistics.quantiles(lat, n=100)
+        print(f"  throughput: {len(lat) / duracion:.1f} reruns/s")
+        print(f"  rerun p50 {q[49]:.0f} ms  p95 {q[94]:.0f} ms  p99 {q[98]:.0f} ms  max {lat[-1]:.0f} ms")
+
+    print("\n  flujo                    ok   error   tasa error")
+    for nombre, c in sorted(metricas.por_flujo.items()):
+        total = c["ok"] + c["error"]
+        print(f"  {nombre:<22} {c['ok']:>5} {c['error']:>7} {c['error'] / total:>11.1%}")
+
+    if metricas.errores:
+        print("\n  errores mas frecuentes:")
+        for mensaje, n in sorted(metricas.errores.items(), key=lambda x: -x[1])[:10]:
+            print(f"  {n:>5}  {mensaje}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="cadena de conexion de la base de prueba (si no, DB_CONN)")
+    parser.add_argument("--url", help="servidor ya levantado; si no, se arranca uno con streamlit run")
+    parser.add_argument("--sesiones", type=int, default=10)
+    parser.add_argument("--duracion", type=float, default=30, help="segundos de carga")
+    parser.add_argument("--rampa", type=float, default=5, help="segundos para arrancar todas las sesiones")
+    parser.add_argument("--timeout", type=float, default=60, help="timeout por rerun")
+    parser.add_argument("--solo-lectura", action="store_true", help="no ejecutar flujos de insercion")
+    args = parser.parse_args()
+
+    if args.db:
+        os.environ["DB_CONN"] = args.db  # lo hereda el servidor; load_dotenv no la pisa
+
+    proceso, url = (None, args.url) if args.url else levantar_servidor()
+    flujos = LECTURAS if args.solo_lectura else LECTURAS + ESCRITURAS
+    try:
+        inicio = time.monotonic()
+        metricas = asyncio.run(carga(url, args, flujos))
+        reporte(metricas, time.monotonic() - inicio, args.sesiones)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Perfilador opcional de un rerun de la app (muestreo de pila).
+
+Se activa con BASKET_PROFILE=1, o agregando ?profile=1 a la URL si el
+servidor lo permite con BASKET_PROFILE_ALLOW=1 (apagado por defecto: si no,
+cualquier visitante podria perfilar en produccion). Un hilo muestrea la pila
+del hilo del script cada BASKET_PROFILE_INTERVAL segundos mientras corre
+main(); apagado no se instala nada, solo se revisa el flag.
+
+Cada rerun perfilado genera un archivo .folded (formato "pila cantidad",
+legible por flamegraph.pl, speedscope o inferno) y un resumen en la barra
+lateral por categoria: SQL, construccion de DataFrames, apply/iterrows,
+cache y serializacion de Streamlit, y codigo de la app. Se conservan los
+ultimos BASKET_PROFILE_MAX archivos.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import streamlit as st
+
+PROFILE_DIR = os.getenv("BASKET_PROFILE_DIR", "perfiles")
+INTERVALO = float(os.getenv("BASKET_PROFILE_INTERVAL", "0.001"))
+# Archivos .folded que se conservan (los mas viejos se borran)
+MAX_ARCHIVOS = int(os.getenv("BASKET_PROFILE_MAX", "50"))
+
+
+def activo() -> bool:
+    """Indica si este rerun se debe perfilar (variable de entorno o query param permitido)."""
+    if os.getenv("BASKET_PROFILE") == "1":
+        return True
+    if os.getenv("BASKET_PROFILE_ALLOW") != "1":
+        return False
+    return st.query_params.get("profile") == "1"
+
+
+def _modulo(filename: str) -> str:
+    # ".../site-packages/pandas/io/sql.py" -> "pandas.io.sql"; "app.py" -> "app"
+    ruta = filename.replace("\\", "/")
+    if "site-packages/" in ruta:
+        ruta = ruta.split("site-packages/", 1)[1]
+    else:
+        ruta = os.path.basename(ruta)
+    return ruta[:-3].replace("/", ".") if ruta.endswith(".py") else ruta
+
+
+# Categorias especificas en orden de prioridad: gana la primera que aparezca
+# en cualquier parte de la pila (p.ej. un read_sql dentro de st.cache_data es SQL)
+CATEGORIAS = [
+    ("SQL", lambda m, f: m == "pandas.io.sql"
+        or (m == "helpers" and f in ("_ejecutar_sp", "_exec", "_conectar"))),
+    ("Streamlit (serializacion)", lambda m, f: m.startswith((
+        "streamlit.dataframe_util", "streamlit.elements.arrow",
+        "streamlit.elements.widgets.data_editor",
+    ))),
+    ("apply/iterrows", lambda m, f: m.startswith("pandas.core")
+        and (m == "pandas.core.apply" or f in ("apply", "iterrows"))),
+    ("DataFrame (tipos)", lambda m, f: m == "helpers" and f == "compactar_df"),
+    ("Streamlit (cache)", lambda m, f: m.startswith("streamlit.runtime.caching")),
+]
+
+
+def _categoria_generica(modulo: str):
+    if modulo.startswith(("pandas", "pyarrow", "numpy")):
+        return "DataFrame"
+    if modulo.startswith("streamlit"):
+        return "Streamlit"
+    return None
+
+
+def _categoria(pila) -> str:
+    """
+    Primera categoria especifica presente en la pila; si no hay ninguna, la
+    generica del frame mas interno (DataFrame/Streamlit) o codigo de la app.
+    """
+    for nombre, coincide in CATEGORIAS:
+        if any(coincide(modulo, funcion) for modulo, funcion in pila):
+            return nombre
+    for modulo, _ in reversed(pila):
+        cat = _categoria_generica(modulo)
+        if cat:
+            return cat
+    return "app"
+
+
+class Muestreador(threading.Thread):
+    """Muestrea la pila de un hilo y acumula pilas colapsadas y categorias."""
+
+    def __init__(self, hilo_id: int, intervalo: float = INTERVALO):
+        super().__init__(daemon=True)
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.categorias = Counter()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            if frame is not None:
+                self._muestra(frame)
+
+    def _muestra(self, frame):
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+
+        # recortar el runner de Streamlit: la pila empieza en app.main
+        inicio = next(
+            (i for i, f in enumerate(frames)
+             if f.f_code.co_name == "main" and _modulo(f.f_code.co_filename) == "app"),
+            None,
+        )
+        if inicio is None:
+            return
+        frames = frames[inicio:]
+
+        pila = [(_modulo(f.f_code.co_filename), f.f_code.co_name) for f in frames]
+        etiquetas = [f"{m}:{fn}" for m, fn in pila]
+        # seccion de la pagina como frame sintetico bajo main
+        pagina = frames[0].f_locals.get("choice")
+        if pagina:
+            etiquetas.insert(1, f"[{pagina}]")
+        self.pilas[";".join(etiquetas)] += 1
+        self.categorias[_categoria(pila)] += 1
+
+    def detener(self):
+        self._parar.set()
+        self.join()
+
+    def guardar(self, directorio: str = PROFILE_DIR) -> str:
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f"rerun-{datetime.now():%Y%m%d-%H%M%S-%f}.folded")
+        with open(ruta, "w", encoding="utf-8") as f:
+            for pila, n in self.pilas.most_common():
+                f.write(f"{pila} {n}\n")
+        _recortar(directorio)
+        return ruta
+
+
+def _recortar(directorio: str, maximo: int = MAX_ARCHIVOS):
+    """Borra los .folded mas viejos hasta dejar maximo (los nombres llevan fecha)."""
+    archivos = sorted(
+        f for f in os.listdir(directorio) if f.startswith("rerun-") and f.endswith(".folded")
+    )
+    for nombre in archivos[:max(len(archivos) - maximo, 0)]:
+        try:
+            os.remove(os.path.join(directorio, nombre))
+        except OSError:
+            pass  # otro rerun ya lo borro
+
+
+def perfilar(fn):
+    """Ejecuta fn (main) muestreando su pila y muestra el desglose en la barra lateral."""
+    muestreador = Muestreador(threading.get_ident())
+    muestreador.start()
+    inicio = time.perf_counter()
+    try:
+        fn()
+    finally:
+        muestreador.detener()
+        duracion = time.perf_counter() - inicio
+        ruta = muestreador.guardar()
+        _mostrar(muestreador.categorias, duracion, ruta)
+
+
+def _mostrar(categorias: Counter, duracion: float, ruta: str):
+    total = sum(categorias.values())
+    with st.sidebar.expander("⏱️ Perfil del rerun", expanded=True):
+        st.caption(f"{duracion * 1000:.0f} ms, {total} muestras")
+        for cat, n in categorias.most_common():
+            st.text(f"{cat:<26} {n / total:6.1%}  ~{duracion * 1000 * n / total:.0f} ms")
+        st.caption(f"Pilas colapsadas: {ruta}")
@@ -0,0 +1,141 @@
+"""
+Snapshots en disco (Arrow IPC) de los datasets de referencia para arrancar
+en caliente despues de un reinicio.
+
+Cada snapshot guarda en su metadata la firma de las tablas de las que sale
+(filas + CHECKSUM_AGG). Al iniciar se cargan con memory map y un hilo en
+segundo plano compara esas firmas con la base; solo los que coinciden se
+usan, una vez cada uno, para la primera carga de la cache. Una request
+espera a la validacion como mucho lo que quede de un unico plazo contado
+desde cargar(), no un plazo por dataset. El mismo hilo reescribe despues,
+cada tanto, los snapshots cuyas tablas cambiaron, fuera de las requests.
+"""
+import os
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+from pyarrow import feather
+from streamlit.logger import get_logger
+
+log = get_logger(__name__)
+
+# Dataset -> tablas que lo componen (para la firma)
+TABLAS = {
+    "ciudades": ["Ciudad"],
+    "estadisticas": ["Estadistica"],
+    "equipos": ["Equipo", "Ciudad"],
+    "jugadores": ["Jugador", "Ciudad", "Equipo"],
+    "juegos": ["Juego"],
+}
+
+
+def sql_firmas(tablas) -> str:
+    """SELECT con filas y checksum de cada tabla (una sola consulta)."""
+    return "\nUNION ALL\n".join(
+        f"SELECT '{t}' AS Tabla, COUNT_BIG(*) AS Filas, "
+        f"CHECKSUM_AGG(BINARY_CHECKSUM(*)) AS Checksum FROM dbo.{t}"
+        for t in tablas
+    )
+
+
+def firma(nombre: str, firmas: dict) -> str:
+    """Firma de un dataset a partir de las firmas por tabla."""
+    return "|".join(f"{t}={firmas[t]}" for t in TABLAS[nombre])
+
+
+class Almacen:
+    """Snapshots cargados en memoria y su estado de validacion."""
+
+    def __init__(self, directorio: str, espera: float):
+        self.directorio = directorio
+        self.espera = espera  # plazo total para la validacion, contado desde cargar()
+        self.limite = None    # momento en que vence ese plazo
+        self.cargados = {}    # nombre -> (firma, pa.Table); se pasa a pandas al usarse
+        self.en_disco = {}    # nombre -> firma del snapshot escrito en disco
+        self.validos = set()
+        self.validado = threading.Event()
+        self.generacion = 0   # sube con cada escritura en la base
+        self.lock = threading.Lock()
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, f"{nombre}.arrow")
+
+    def cargar(self):
+        """Lee con memory map los snapshots existentes (sin validarlos)."""
+        self.limite = time.monotonic() + self.espera
+        for nombre in TABLAS:
+            ruta = self._ruta(nombre)
+            if not os.path.exists(ruta):
+                continue
+            try:
+                tabla = feather.read_table(ruta, memory_map=True)
+                meta = tabla.schema.metadata or {}
+                guardada = meta.get(b"firma", b"").decode()
+                self.cargados[nombre] = (guardada, tabla)
+                self.en_disco[nombre] = guardada
+            except Exception as e:
+                # snapshot corrupto o de otra version: se regenera
+                log.warning("snapshot %s descartado: %s", nombre, e)
+
+    def validar(self, obtener_firmas):
+        """Compara las firmas guardadas con las actuales (corre en segundo plano)."""
+        try:
+            if not self.cargados:
+                return
+            generacion = self.generacion
+            firmas = obtener_firmas(sorted({t for n in self.cargados for t in TABLAS[n]}))
+            with self.lock:
+                if generacion != self.generacion:
+                    return  # hubo escrituras mientras se validaba
+                for nombre, (guardada, _) in self.cargados.items():
+                    if guardada and guardada == firma(nombre, firmas):
+                        self.validos.add(nombre)
+        except Exception as e:
+            # sin validacion no se usa ningun snapshot
+            log.warning("no se pudieron validar los snapshots: %s", e)
+        finally:
+            self.validado.set()
+
+    def obtener(self, nombre: str):
+        """Devuelve la tabla Arrow validada del dataset (solo la primera vez) o None."""
+        if nombre not in self.cargados or self.limite is None:
+            return None
+        # un solo plazo para todos los datasets: pasado, no se espera mas
+        if not self.validado.wait(max(self.limite - time.monotonic(), 0)):
+            return None
+        with self.lock:
+            if nombre not in self.validos:
+                return None
+            self.validos.discard(nombre)
+            return self.cargados.pop(nombre)[1]
+
+    def guardar(self, nombre: str, df, firma_actual: str):
+        """Escribe el snapshot de forma atomica con su firma en la metadata."""
+        os.makedirs(self.directorio, exist_ok=True)
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        meta = dict(tabla.schema.metadata or {})
+        meta[b"firma"] = firma_actual.encode()
+        tabla = tabla.replace_schema_metadata(meta)
+        # temporal unico: otro proceso puede estar escribiendo el mismo dataset
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, prefix=f".{nombre}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            feather.write_feather(tabla, tmp, compression="uncompressed")
+            os.replace(tmp, self._ruta(nombre))
+        except BaseException:
+            os.remove(tmp)
+            raise
+        self.en_disco[nombre] = firma_actual
+
+    def invalidar(self, tablas=None):
+        """Descarta los snapshots en memoria que dependen de las tablas escritas (todos si None)."""
+        afectados = [n for n in TABLAS if tablas is None or set(TABLAS[n]) & set(tablas)]
+        if not afectados:
+            return
+        with self.lock:
+            self.generacion += 1
+            for nombre in afectados:
+                self.validos.discard(nombre)
+                self.cargados.pop(nombre, None)
@@ -0,0 +1,117 @@
+"""
+Tabla de posiciones de la liga.
+
+Parte del marcador de todos los juegos (list_juegos_detalle: una consulta
+que ya suma Cantidad * Valor por juego y equipo) y calcula todo con
+operaciones vectorizadas de pandas/NumPy, sin recorrer juegos en Python.
+
+Orden: % de victorias, enfrentamientos directos entre los equipos empatados,
+diferencia de puntos, puntos a favor y nombre.
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNAS = [
+    "Pos", "IdEquipo", "Equipo", "PJ", "G", "E", "P",
+    "PctVictorias", "PF", "PC", "Dif", "H2H", "Racha",
+]
+
+
+def _por_equipo(juegos: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por equipo y juego jugado (formato largo)."""
+    jugados = juegos.loc[(juegos.PuntosA + juegos.PuntosB) > 0]
+    lados = []
+    for propio, rival in (("A", "B"), ("B", "A")):
+        lados.append(pd.DataFrame({
+            "IdJuego": jugados.IdJuego.astype(str).to_numpy(),
+            "Fecha": jugados.FechaYHoraJuego.to_numpy(),
+            "IdEquipo": jugados[f"IdEquipo{propio}"].astype(str).to_numpy(),
+            "Equipo": jugados[f"Equipo{propio}"].astype(str).to_numpy(),
+            "Rival": jugados[f"IdEquipo{rival}"].astype(str).to_numpy(),
+            "PF": jugados[f"Puntos{propio}"].to_numpy(dtype=np.int64),
+            "PC": jugados[f"Puntos{rival}"].to_numpy(dtype=np.int64),
+        }))
+    largo = pd.concat(lados, ignore_index=True)
+    largo["Res"] = np.sign(largo.PF - largo.PC)  # 1 victoria, 0 empate, -1 derrota
+    largo["G"] = (largo.Res == 1).astype(np.int64)
+    largo["E"] = (largo.Res == 0).astype(np.int64)
+    largo["P"] = (largo.Res == -1).astype(np.int64)
+    return largo
+
+
+def _rachas(largo: pd.DataFrame) -> pd.Series:
+    """Racha actual de cada equipo, p.ej. 'G3' o 'P1'."""
+    orden = largo.sort_values(["IdEquipo", "Fecha", "IdJuego"], kind="stable")
+    nueva = (orden.Res != orden.Res.shift()) | (orden.IdEquipo != orden.IdEquipo.shift())
+    largo_racha = orden.groupby(nueva.cumsum()).cumcount() + 1
+    ultimo = orden.assign(N=largo_racha).groupby("IdEquipo").tail(1).set_index("IdEquipo")
+    letra = ultimo.Res.map({1: "G", 0: "E", -1: "P"})
+    return letra + ultimo.N.astype(str)
+
+
+def _pct(g, e, pj):
+    return np.where(pj > 0, (g + 0.5 * e) / np.maximum(pj, 1), 0.0)
+
+
+def _enfrentamientos(largo: pd.DataFrame, pct: pd.Series) -> pd.Series:
+    """
+    % de victorias de cada equipo solo contra los rivales con su mismo % de
+    victorias. Sin empate o sin juegos entre ellos queda en 0.5 (neutro).
+    """
+    grupo = pct.round(9)
+    tamanio = grupo.map(grupo.value_counts())
+    propio = largo.IdEquipo.map(grupo)
+    rival = largo.Rival.map(grupo)
+    entre_empatados = (propio == rival) & (largo.IdEquipo.map(tamanio) > 1)
+    h2h = largo.loc[entre_empatados].groupby("IdEquipo")[["G", "E"]].agg(["sum", "size"])
+    if h2h.empty:
+        return pd.Series(0.5, index=pct.index)
+    valor = pd.Series(
+        _pct(h2h[("G", "sum")], h2h[("E", "sum")], h2h[("G", "size")]),
+        index=h2h.index,
+    )
+    return valor.reindex(pct.index).fillna(0.5)
+
+
+def tabla_posiciones(juegos: pd.DataFrame, equipos: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Calcula la tabla de posiciones a partir de list_juegos_detalle().
+    Los juegos sin estadisticas (0-0) no cuentan. Si se pasa equipos
+    (list_equipos()) tambien aparecen los equipos sin juegos.
+    """
+    largo = _por_equipo(juegos)
+    tabla = largo.groupby("IdEquipo").agg(
+        Equipo=("Equipo", "first"),
+        PJ=("Res", "size"),
+        G=("G", "sum"),
+        E=("E", "sum"),
+        P=("P", "sum"),
+        PF=("PF", "sum"),
+        PC=("PC", "sum"),
+    )
+
+    if equipos is not None and not equipos.empty:
+        ids = equipos.IdEquipo.astype(str)
+        tabla = tabla.reindex(ids.to_numpy())
+        tabla["Equipo"] = tabla.Equipo.fillna(
+            pd.Series(equipos.NomEquipo.astype(str).to_numpy(), index=ids.to_numpy())
+        )
+        tabla = tabla.fillna({c: 0 for c in ("PJ", "G", "E", "P", "PF", "PC")})
+    if tabla.empty:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    for c in ("PJ", "G", "E", "P", "PF", "PC"):
+        tabla[c] = tabla[c].astype(np.int64)
+    tabla["PctVictorias"] = _pct(tabla.G, tabla.E, tabla.PJ)
+    tabla["Dif"] = tabla.PF - tabla.PC
+    tabla["H2H"] = _enfrentamientos(largo, tabla.PctVictorias)
+    tabla["Racha"] = _rachas(largo).reindex(tabla.index).fillna("-") if len(largo) else "-"
+
+    tabla = tabla.rename_axis("IdEquipo").reset_index()
+    tabla = tabla.sort_values(
+        ["PctVictorias", "H2H", "Dif", "PF", "Equipo"],
+        ascending=[False, False, False, False, True],
+        kind="stable",
+    )
+    tabla["Pos"] = np.arange(1, len(tabla) + 1)
+    return tabla[COLUMNAS].reset_index(drop=True)
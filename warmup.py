@@ -0,0 +1,72 @@
+"""
+Calentamiento en segundo plano al iniciar el servidor: abre las conexiones
+de los pools, espera la validacion de los snapshots, precarga los listados
+de referencia y los box scores de los ultimos juegos (compila el plan del
+SP). No bloquea la app; el estado se consulta con iniciar().listo y queda
+en el log.
+
+Cada consulta de este hilo toma su propia conexion del pool, igual que los
+hilos de script: nunca comparte una conexion pyodbc con otro hilo.
+"""
+import os
+import threading
+import time
+
+import streamlit as st
+from streamlit.logger import get_logger
+
+import helpers
+
+log = get_logger(__name__)
+
+# Cantidad de juegos recientes cuyos box scores se precargan
+WARMUP_JUEGOS = int(os.getenv("WARMUP_JUEGOS", "5"))
+
+
+class Estado:
+    """Pasos del calentamiento con su duracion y si terminaron bien."""
+
+    def __init__(self):
+        self.pasos = {}  # nombre -> (ok, segundos)
+        self.listo = threading.Event()
+        self.inicio = time.perf_counter()
+        self.duracion = None
+
+
+def _paso(estado: Estado, nombre: str, fn):
+    inicio = time.perf_counter()
+    try:
+        fn()
+        ok = True
+    except Exception as e:
+        ok = False
+        log.warning("warm-up %s fallo: %s", nombre, e)
+    segundos = time.perf_counter() - inicio
+    estado.pasos[nombre] = (ok, segundos)
+    log.info("warm-up %s: %.0f ms", nombre, segundos * 1000)
+
+
+def _box_scores_recientes():
+    df = helpers.list_juegos_detalle()
+    for id_juego in df.sort_values("FechaYHoraJuego").IdJuego.tail(WARMUP_JUEGOS):
+        helpers.get_estadisticas_juego(id_juego)
+
+
+def calentar(estado: Estado):
+    _paso(estado, "pool primario", lambda: helpers.get_pool().abrir())
+    _paso(estado, "pool lectura", lambda: helpers.get_read_pool().abrir())
+    _paso(estado, "validacion snapshots", lambda: helpers.iniciar_snapshots().validado.wait())
+    for nombre, fn in helpers.DATASETS.items():
+        _paso(estado, f"lista {nombre}", fn)
+    _paso(estado, "box scores recientes", _box_scores_recientes)
+    estado.duracion = time.perf_counter() - estado.inicio
+    estado.listo.set()
+    log.info("warm-up listo en %.2f s", estado.duracion)
+
+
+@st.cache_resource  # una sola vez por proceso
+def iniciar() -> Estado:
+    """Lanza el calentamiento en un hilo de fondo y devuelve su estado."""
+    estado = Estado()
+    threading.Thread(target=calentar, args=(estado,), name="warmup", daemon=True).start()
+    return estado